@@ -1,16 +1,34 @@
 import json
 import os
+import sys
+import numpy as np
 import pandas as pd
+import matplotlib
+matplotlib.use('Agg')  # 仅输出图片文件，使用非交互式后端
 import matplotlib.pyplot as plt
-import seaborn as sns
-import plotly.express as px
-import plotly.graph_objects as go
-from collections import defaultdict
 
 # 设置中文字体
 plt.rcParams["font.family"] = ["SimHei", "WenQuanYi Micro Hei", "Heiti TC"]
 plt.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
 
+# 三个渠道名称，顺序对应状态数组的渠道维度
+CHANNEL_NAMES = ['渠道一', '渠道二', '渠道三']
+
+# 状态数组中表示该渠道无记录的占位值
+STATUS_MISSING = 127
+
+# 图表边距：固定边距替代逐图运行tight_layout，底部为旋转的x轴标签留出空间
+PLOT_MARGINS = dict(bottom=0.25, left=0.1, right=0.95, top=0.9)
+PIE_MARGINS = dict(bottom=0.05, left=0.05, right=0.95, top=0.9)
+
+# 应用信息行的字段名及其对应的键（“权限三元组:”行无需处理）
+APP_INFO_FIELDS = {
+    '应用名称': 'app_name',
+    '应用ID': 'app_id',
+    '应用类别': 'genre',
+    '权限三元组': None
+}
+
 def load_triple_data(file_path):
     """加载权限三元组数据"""
     apps_data = []
@@ -19,58 +37,56 @@ def load_triple_data(file_path):
     header = None
 
     with open(file_path, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-        
-        # 解析CSV表头
-        if lines and ',' in lines[0]:
-            header = lines[0].strip().split(',')
-            lines = lines[1:]
+        # 解析CSV表头（首行不是表头时回到文件开头）
+        first_line = f.readline()
+        if ',' in first_line:
+            header = first_line.strip().split(',')
+        else:
+            f.seek(0)
         
-        for line in lines:
+        # 逐行读取，避免一次性载入整个文件
+        for line in f:
             line = line.strip()
             if not line:
                 continue
             
-            if line.startswith('应用名称:'):
-                # 如果已有当前应用数据，先保存
-                if current_app and triples:
-                    current_app['triples'] = triples
-                    apps_data.append(current_app)
-                    triples = []
-                
-                # 开始新应用
-                current_app = {
-                    'app_name': line.replace('应用名称:', '').strip(),
-                    'app_id': '',
-                    'genre': ''
-                }
-            elif line.startswith('应用ID:'):
-                current_app['app_id'] = line.replace('应用ID:', '').strip()
-            elif line.startswith('应用类别:'):
-                current_app['genre'] = line.replace('应用类别:', '').strip()
-            elif line.startswith('权限三元组:'):
-                continue
-            elif line.startswith('---'):
+            if line.startswith('---'):
                 # 应用结束，保存数据
                 if current_app and triples:
                     current_app['triples'] = triples
                     apps_data.append(current_app)
                     current_app = {}
                     triples = []
+                continue
+            
+            # 按首个冒号拆分，根据字段名分派
+            key, sep, value = line.partition(':')
+            if sep and key in APP_INFO_FIELDS:
+                field = APP_INFO_FIELDS[key]
+                if field == 'app_name':
+                    # 如果已有当前应用数据，先保存
+                    if current_app and triples:
+                        current_app['triples'] = triples
+                        apps_data.append(current_app)
+                        triples = []
+                    
+                    # 开始新应用
+                    current_app = {
+                        'app_name': value.strip(),
+                        'app_id': '',
+                        'genre': ''
+                    }
+                elif field:
+                    current_app[field] = value.strip()
             elif ',' in line:
-                # 解析三元组
-                parts = line.split(',')
-                if len(parts) == 3:
-                    channel, permission, status = parts
-                    try:
-                        status = int(status)
-                        triples.append({
-                            'channel': channel,
-                            'permission': permission,
-                            'status': status
-                        })
-                    except ValueError:
-                        continue
+                # 解析三元组，以 (渠道, 权限, 状态) 元组存储
+                # 字段数不足或状态不是整数时均抛出ValueError，跳过该行
+                try:
+                    channel, permission, status = line.split(',', 2)
+                    # 渠道和权限取值很少，驻留后所有三元组共享同一字符串对象
+                    triples.append((sys.intern(channel), sys.intern(permission), int(status)))
+                except ValueError:
+                    continue
     
     # 保存最后一个应用
     if current_app and triples:
@@ -79,123 +95,122 @@ def load_triple_data(file_path):
     
     return apps_data
 
-def calculate_metrics(apps_data):
+def _first_contribution_order(genre_code, contributes):
+    """返回有贡献的类别编号，按各类别第一个有贡献的应用的先后排列"""
+    apps = np.flatnonzero(contributes)
+    codes, first = np.unique(genre_code[apps], return_index=True)
+    return codes[np.argsort(first)]
+
+def _genre_ratio(genres, order, numerator, denominator):
+    """按给定的类别顺序计算百分比"""
+    return dict(zip(genres[order].tolist(), (numerator[order] / denominator[order] * 100).tolist()))
+
+def triples_to_dataframe(apps_data):
+    """将所有应用的三元组展开为一张表，类别、渠道、权限列以分类类型存储"""
+    triples_df = pd.DataFrame.from_records(
+        [(app_idx, app['genre'], channel, permission, status)
+         for app_idx, app in enumerate(apps_data)
+         for channel, permission, status in app['triples']],
+        columns=['app_idx', 'genre', 'channel', 'permission', 'status']
+    )
+    triples_df['genre'] = triples_df['genre'].astype('category')
+    triples_df['channel'] = pd.Categorical(triples_df['channel'], categories=CHANNEL_NAMES)
+    triples_df['permission'] = triples_df['permission'].astype('category')
+    return triples_df
+
+def calculate_metrics(triples_df):
     """计算所有指标"""
-    # 1. 总体一致性覆盖度(OCC)计算
-    # OCC定义：所有应用中，三个渠道权限状态一致的比例
-    all_permissions_count = 0
-    consistent_count = 0
-    apps_occ = []
+    total_permissions = len(triples_df)
+    
+    # 应用、权限、渠道、类别均使用整数编码，后续指标在稠密数组上计算
+    # 渠道固定为三个已知渠道，其他渠道名称的记录不参与统计
+    channel = triples_df['channel'].astype(pd.CategoricalDtype(CHANNEL_NAMES))
+    known = (channel.cat.codes >= 0).to_numpy()
+    chan_code = channel.cat.codes.to_numpy(np.int64)[known]
+    permission = triples_df['permission'].astype('category')
+    perm_code = permission.cat.codes.to_numpy(np.int64)[known]
+    n_perms = len(permission.cat.categories)
+    all_app_code = triples_df['app_idx'].to_numpy(np.int64)
+    app_code = all_app_code[known]
+    n_apps = int(all_app_code.max()) + 1 if total_permissions else 0
+    status = triples_df['status'].to_numpy(np.int8)[known]
+    
+    # 类别按首次出现的顺序编号
+    genre = triples_df['genre'].astype('category')
+    app_genre = np.zeros(n_apps, dtype=np.int64)
+    app_genre[all_app_code] = genre.cat.codes.to_numpy(np.int64)
+    genre_code, first_seen = pd.factorize(app_genre)
+    genres = genre.cat.categories.to_numpy(dtype=object)[first_seen]
+    
+    # 类别级计数器：按类别编号索引的数组
+    occ_num, occ_den, ccor_num, ccor_den, cccr_num, cccr_den, ica_num = (
+        np.zeros(len(genres), dtype=np.int64) for _ in range(7))
+    
+    # 按 (应用, 权限, 渠道) 稳定排序，同一组内保持文件中的先后顺序
+    key = (app_code * n_perms + perm_code) * len(CHANNEL_NAMES) + chan_code
+    order = np.argsort(key, kind='stable')
+    sorted_key = key[order]
+    sorted_status = status[order]
+    same_key = sorted_key[1:] == sorted_key[:-1]
     
-    # 2. 按应用类别统计OCC
-    genre_occ = defaultdict(lambda: {'count': 0, 'consistent': 0})
+    # 5. 内部矛盾(ICA)：同一渠道同一权限的状态与上一条记录不同
+    ica_mask = np.zeros(len(key), dtype=bool)
+    ica_mask[order[1:]] = same_key & (sorted_status[1:] != sorted_status[:-1])
+    ica_count = int(ica_mask.sum())
+    np.add.at(ica_num, genre_code[app_code[ica_mask]], 1)
+    
+    # 每个应用的权限状态表 state[应用, 权限, 渠道]，同一渠道重复记录以最后一条为准
+    last = order[np.append(~same_key, True)] if len(key) else order
+    state = np.full((n_apps, n_perms, len(CHANNEL_NAMES)), STATUS_MISSING, dtype=np.int8)
+    state[app_code[last], perm_code[last], chan_code[last]] = status[last]
+    
+    # 每个应用出现过的权限
+    present = np.zeros((n_apps, n_perms), dtype=bool)
+    present[all_app_code, permission.cat.codes.to_numpy(np.int64)] = True
+    
+    # 三个渠道都存在的权限，各渠道状态只取一次视图
+    has_all = (state != STATUS_MISSING).all(axis=2)
+    c1, c2, c3 = state[:, :, 0], state[:, :, 1], state[:, :, 2]
+    
+    # 1. 总体一致性覆盖度(OCC)：三个渠道权限状态一致且不为-1
+    consistent = has_all & (c1 == c2) & (c2 == c3) & (c1 != -1)
     
     # 3. 跨渠道遗漏(CCOR)：渠道一(数据收集)存在但渠道二(权限申请)缺失的权限比例
-    ccor_data = defaultdict(lambda: {'total': 0, 'missing': 0})
+    collected = has_all & (c1 == 1)
+    missing = collected & (c2 == 0)
     
     # 4. 跨渠道矛盾(CCCR)：渠道一和渠道三明确矛盾的情况
-    cccr_data = defaultdict(lambda: {'total': 0, 'conflict': 0})
+    conflict = (collected & (c3 == 0)) | (has_all & (c1 == 0) & (c3 == 1))
     
-    # 5. 内部矛盾(ICA)：单个渠道内存在矛盾的情况
-    ica_count = 0
-    ica_by_genre = defaultdict(int)
-    total_permissions = 0
+    # 计算应用级OCC
+    app_consistent = consistent.sum(axis=1)
+    app_total = present.sum(axis=1)
+    scored = app_total > 0
     
-    for app_idx, app in enumerate(apps_data):
-        app_genre = app['genre']
-        app_triples = app['triples']
-        
-        # 按权限和渠道分组
-        permission_channels = defaultdict(dict)
-        for triple in app_triples:
-            channel = triple['channel']
-            permission = triple['permission']
-            status = triple['status']
-            
-            # 检查内部矛盾
-            if channel in permission_channels[permission]:
-                # 如果同一渠道同一权限已经有记录且状态不同
-                if permission_channels[permission][channel] != status:
-                    ica_count += 1
-                    ica_by_genre[app_genre] += 1
-            permission_channels[permission][channel] = status
-            
-            total_permissions += 1
-        
-        # 计算应用级OCC
-        app_consistent = 0
-        app_total = len(permission_channels)
-        
-        for permission, channels in permission_channels.items():
-            # 检查三个渠道是否都存在且状态一致
-            if len(channels) == 3:
-                statuses = list(channels.values())
-                if all(s == statuses[0] for s in statuses) and statuses[0] != -1:
-                    app_consistent += 1
-                    consistent_count += 1
-                
-                # 计算CCOR (渠道一存在但渠道二缺失)
-                if '渠道一' in channels and '渠道二' in channels:
-                    ccor_data[app_genre]['total'] += 1
-                    if channels['渠道一'] == 1 and channels['渠道二'] == 0:
-                        ccor_data[app_genre]['missing'] += 1
-                
-                # 计算CCCR (渠道一和渠道三明确矛盾)
-                if '渠道一' in channels and '渠道三' in channels:
-                    cccr_data[app_genre]['total'] += 1
-                    if (channels['渠道一'] == 1 and channels['渠道三'] == 0) or \
-                       (channels['渠道一'] == 0 and channels['渠道三'] == 1):
-                        cccr_data[app_genre]['conflict'] += 1
-            
-            all_permissions_count += 1
-        
-        # 计算应用级OCC
-        if app_total > 0:
-            app_occ = app_consistent / app_total * 100
-            apps_occ.append(app_occ)
-            
-            # 更新类别OCC
-            genre_occ[app_genre]['count'] += app_total
-            genre_occ[app_genre]['consistent'] += app_consistent
-    
-    # 计算总体OCC趋势
-    overall_occ_trend = []
-    cumulative_consistent = 0
-    cumulative_total = 0
-    for i, app_occ in enumerate(apps_occ):
-        # 假设每个应用贡献相同数量的权限
-        app_consistent = int(app_occ / 100 * len(permission_channels))
-        cumulative_consistent += app_consistent
-        cumulative_total += len(permission_channels)
-        overall_occ = cumulative_consistent / cumulative_total * 100 if cumulative_total > 0 else 0
-        overall_occ_trend.append(overall_occ)
-    
-    # 计算类别级OCC
-    genre_occ_result = {}
-    for genre, data in genre_occ.items():
-        if data['count'] > 0:
-            genre_occ_result[genre] = data['consistent'] / data['count'] * 100
-        else:
-            genre_occ_result[genre] = 0
+    # 计算总体OCC趋势：按应用顺序累计的一致权限数 / 累计权限数
+    cumulative_consistent = np.cumsum(app_consistent[scored], dtype=np.int64)
+    cumulative_total = np.cumsum(app_total[scored], dtype=np.int64)
+    overall_occ_trend = (cumulative_consistent / np.maximum(cumulative_total, 1) * 100).tolist()
     
-    # 计算类别级CCOR
-    ccor_result = {}
-    for genre, data in ccor_data.items():
-        if data['total'] > 0:
-            ccor_result[genre] = data['missing'] / data['total'] * 100
-        else:
-            ccor_result[genre] = 0
+    # 更新类别计数器
+    app_checked = has_all.sum(axis=1)
+    np.add.at(occ_num, genre_code, app_consistent)
+    np.add.at(occ_den, genre_code, app_total)
+    np.add.at(ccor_num, genre_code, missing.sum(axis=1))
+    np.add.at(ccor_den, genre_code, app_checked)
+    np.add.at(cccr_num, genre_code, conflict.sum(axis=1))
+    np.add.at(cccr_den, genre_code, app_checked)
     
-    # 计算类别级CCCR
-    cccr_result = {}
-    for genre, data in cccr_data.items():
-        if data['total'] > 0:
-            cccr_result[genre] = data['conflict'] / data['total'] * 100
-        else:
-            cccr_result[genre] = 0
+    # 计算类别级OCC、CCOR、CCCR，各类别按第一个计入该指标的应用排列
+    genre_occ_result = _genre_ratio(genres, _first_contribution_order(genre_code, scored), occ_num, occ_den)
+    checked_order = _first_contribution_order(genre_code, app_checked > 0)
+    ccor_result = _genre_ratio(genres, checked_order, ccor_num, ccor_den)
+    cccr_result = _genre_ratio(genres, checked_order, cccr_num, cccr_den)
     
-    # 计算ICA比例
+    # 计算ICA比例，类别按第一次出现内部矛盾的应用排列
     ica_ratio = ica_count / total_permissions * 100 if total_permissions > 0 else 0
+    ica_order = _first_contribution_order(genre_code, np.bincount(app_code[ica_mask], minlength=n_apps) > 0)
+    ica_by_genre = dict(zip(genres[ica_order].tolist(), ica_num[ica_order].tolist()))
     
     return {
         'overall_occ_trend': overall_occ_trend,
@@ -206,37 +221,52 @@ def calculate_metrics(apps_data):
         'ica_by_genre': ica_by_genre
     }
 
-def visualize_overall_occ_trend(occ_trend):
+def _prepare_axes(ax, figsize=(12, 6), margins=PLOT_MARGINS):
+    """清空复用的坐标轴并设置画布尺寸和边距"""
+    ax.clear()
+    # clear()不会恢复饼图修改过的边框和纵横比
+    ax.set_frame_on(True)
+    ax.set_aspect('auto')
+    ax.figure.set_size_inches(figsize)
+    ax.figure.subplots_adjust(**margins)
+
+def _bar_colors(cmap_name, count):
+    """从色图中均匀取出柱状图各柱的颜色（避开色图两端的极值色）"""
+    return plt.get_cmap(cmap_name)(np.linspace(0, 1, count + 2)[1:-1])
+
+def _save_figure(ax, output_file):
+    """以固定DPI保存图片，PNG使用低压缩级别以加快编码"""
+    ax.figure.savefig(output_file, dpi=100, pil_kwargs={'compress_level': 1})
+
+def visualize_overall_occ_trend(occ_trend, ax):
     """可视化总体OCC趋势"""
-    plt.figure(figsize=(12, 6))
-    plt.plot(range(1, len(occ_trend) + 1), occ_trend, marker='o', linestyle='-', color='blue')
-    plt.title('总体一致性覆盖度(OCC)趋势分析')
-    plt.xlabel('应用数量')
-    plt.ylabel('OCC (%)')
-    plt.grid(True)
-    plt.tight_layout()
-    plt.savefig('viz_occ_trend.png')
-    plt.close()
+    _prepare_axes(ax)
+    ax.plot(range(1, len(occ_trend) + 1), occ_trend, marker='o', linestyle='-', color='blue')
+    ax.set_title('总体一致性覆盖度(OCC)趋势分析')
+    ax.set_xlabel('应用数量')
+    ax.set_ylabel('OCC (%)')
+    ax.grid(True)
+    _save_figure(ax, 'viz_occ_trend.png')
     print('总体OCC趋势图已保存为 viz_occ_trend.png')
 
-def visualize_genre_occ(genre_occ):
+def visualize_genre_occ(genre_occ, ax):
     """可视化按应用类别统计的OCC"""
     # 分组柱状图
-    plt.figure(figsize=(12, 6))
+    _prepare_axes(ax)
     genres = list(genre_occ.keys())
     occ_values = list(genre_occ.values())
     
-    sns.barplot(x=genres, y=occ_values, palette='viridis')
-    plt.title('不同应用类别的一致性覆盖度(OCC)')
-    plt.xlabel('应用类别')
-    plt.ylabel('OCC (%)')
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    plt.savefig('viz_genre_occ_bar.png')
-    plt.close()
+    ax.bar(genres, occ_values, color=_bar_colors('viridis', len(genres)))
+    ax.set_title('不同应用类别的一致性覆盖度(OCC)')
+    ax.set_xlabel('应用类别')
+    ax.set_ylabel('OCC (%)')
+    ax.tick_params(axis='x', labelrotation=45)
+    _save_figure(ax, 'viz_genre_occ_bar.png')
     print('应用类别OCC柱状图已保存为 viz_genre_occ_bar.png')
     
-    # 雷达图
+    # 雷达图（plotly导入较慢，仅在此处使用时导入）
+    import plotly.express as px
+    
     # 为雷达图准备数据
     radar_data = pd.DataFrame({
         'category': genres,
@@ -253,7 +283,7 @@ def visualize_genre_occ(genre_occ):
     fig.write_html('viz_genre_occ_radar.html')
     print('应用类别OCC雷达图已保存为 viz_genre_occ_radar.html')
 
-def visualize_ccor(ccor_data):
+def visualize_ccor(ccor_data, ax):
     """可视化跨渠道遗漏(CCOR)"""
     genres = list(ccor_data.keys())
     ccor_values = list(ccor_data.values())
@@ -261,95 +291,103 @@ def visualize_ccor(ccor_data):
     # 计算非遗漏比例
     non_ccor_values = [100 - val for val in ccor_values]
     
-    plt.figure(figsize=(12, 6))
+    _prepare_axes(ax)
     
     # 堆叠柱状图
-    plt.bar(genres, non_ccor_values, label='无遗漏', color='green')
-    plt.bar(genres, ccor_values, bottom=non_ccor_values, label='有遗漏', color='red')
-    
-    plt.title('跨渠道遗漏(CCOR)分析')
-    plt.xlabel('应用类别')
-    plt.ylabel('比例 (%)')
-    plt.xticks(rotation=45)
-    plt.legend()
-    plt.tight_layout()
-    plt.savefig('viz_ccor_stacked_bar.png')
-    plt.close()
+    ax.bar(genres, non_ccor_values, label='无遗漏', color='green')
+    ax.bar(genres, ccor_values, bottom=non_ccor_values, label='有遗漏', color='red')
+    
+    ax.set_title('跨渠道遗漏(CCOR)分析')
+    ax.set_xlabel('应用类别')
+    ax.set_ylabel('比例 (%)')
+    ax.tick_params(axis='x', labelrotation=45)
+    ax.legend()
+    _save_figure(ax, 'viz_ccor_stacked_bar.png')
     print('CCOR堆叠柱状图已保存为 viz_ccor_stacked_bar.png')
 
-def visualize_cccr(cccr_data):
+def visualize_cccr(cccr_data, ax):
     """可视化跨渠道矛盾(CCCR)"""
-    plt.figure(figsize=(12, 6))
+    _prepare_axes(ax)
     genres = list(cccr_data.keys())
     cccr_values = list(cccr_data.values())
     
-    sns.barplot(x=genres, y=cccr_values, palette='magma')
-    plt.title('跨渠道矛盾(CCCR)分析')
-    plt.xlabel('应用类别')
-    plt.ylabel('矛盾比例 (%)')
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    plt.savefig('viz_cccr_bar.png')
-    plt.close()
+    ax.bar(genres, cccr_values, color=_bar_colors('magma', len(genres)))
+    ax.set_title('跨渠道矛盾(CCCR)分析')
+    ax.set_xlabel('应用类别')
+    ax.set_ylabel('矛盾比例 (%)')
+    ax.tick_params(axis='x', labelrotation=45)
+    _save_figure(ax, 'viz_cccr_bar.png')
     print('CCCR条形图已保存为 viz_cccr_bar.png')
 
-def visualize_ica(ica_ratio, ica_by_genre):
+def visualize_ica(ica_ratio, ica_by_genre, ax):
     """可视化内部矛盾(ICA)"""
     # 饼图
     labels = ['无内部矛盾', '有内部矛盾']
     sizes = [100 - ica_ratio, ica_ratio]
     colors = ['blue', 'red']
     
-    plt.figure(figsize=(8, 8))
-    plt.pie(sizes, labels=labels, colors=colors, autopct='%1.1f%%', startangle=90)
-    plt.axis('equal')  # 确保饼图是圆的
-    plt.title('内部矛盾(ICA)比例')
-    plt.savefig('viz_ica_pie.png')
-    plt.close()
+    _prepare_axes(ax, figsize=(8, 8), margins=PIE_MARGINS)
+    ax.pie(sizes, labels=labels, colors=colors, autopct='%1.1f%%', startangle=90)
+    ax.axis('equal')  # 确保饼图是圆的
+    ax.set_title('内部矛盾(ICA)比例')
+    _save_figure(ax, 'viz_ica_pie.png')
     print('ICA饼图已保存为 viz_ica_pie.png')
     
     # 按类别条形图
     if ica_by_genre:
-        plt.figure(figsize=(12, 6))
+        _prepare_axes(ax)
         genres = list(ica_by_genre.keys())
         ica_counts = list(ica_by_genre.values())
         
-        sns.barplot(x=genres, y=ica_counts, palette='coolwarm')
-        plt.title('不同应用类别的内部矛盾(ICA)数量')
-        plt.xlabel('应用类别')
-        plt.ylabel('矛盾数量')
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-        plt.savefig('viz_ica_by_genre_bar.png')
-        plt.close()
+        ax.bar(genres, ica_counts, color=_bar_colors('coolwarm', len(genres)))
+        ax.set_title('不同应用类别的内部矛盾(ICA)数量')
+        ax.set_xlabel('应用类别')
+        ax.set_ylabel('矛盾数量')
+        ax.tick_params(axis='x', labelrotation=45)
+        _save_figure(ax, 'viz_ica_by_genre_bar.png')
         print('类别ICA条形图已保存为 viz_ica_by_genre_bar.png')
 
 def main():
     # 加载数据
     input_file = 'permission_triples.txt'
-    print(f'正在加载数据: {input_file}')
-    apps_data = load_triple_data(input_file)
-    print(f'成功加载 {len(apps_data)} 个应用的数据')
+    parquet_file = 'permission_triples.parquet'
+    # 优先使用生成脚本同时输出的Parquet缓存（文本文件不存在或缓存不早于文本文件时）
+    triples_df = None
+    if os.path.exists(parquet_file) and (
+            not os.path.exists(input_file) or os.path.getmtime(parquet_file) >= os.path.getmtime(input_file)):
+        print(f'正在加载数据: {parquet_file}')
+        try:
+            triples_df = pd.read_parquet(parquet_file)
+        except ImportError:
+            print(f'警告: 未安装Parquet引擎(pyarrow)，改为解析 {input_file}')
+    if triples_df is None:
+        print(f'正在加载数据: {input_file}')
+        triples_df = triples_to_dataframe(load_triple_data(input_file))
+    print(f'成功加载 {triples_df["app_idx"].nunique()} 个应用的数据')
     
     # 计算指标
     print('正在计算指标...')
-    metrics = calculate_metrics(apps_data)
+    metrics = calculate_metrics(triples_df)
     print('指标计算完成')
     
+    # 所有图表复用同一个画布
+    fig, ax = plt.subplots(figsize=(12, 6))
+    
     # 可视化1: 总体OCC趋势
-    visualize_overall_occ_trend(metrics['overall_occ_trend'])
+    visualize_overall_occ_trend(metrics['overall_occ_trend'], ax)
     
     # 可视化2: 按应用类别OCC
-    visualize_genre_occ(metrics['genre_occ'])
+    visualize_genre_occ(metrics['genre_occ'], ax)
     
     # 可视化3: 跨渠道遗漏(CCOR)
-    visualize_ccor(metrics['ccor'])
+    visualize_ccor(metrics['ccor'], ax)
     
     # 可视化4: 跨渠道矛盾(CCCR)
-    visualize_cccr(metrics['cccr'])
+    visualize_cccr(metrics['cccr'], ax)
     
     # 可视化5: 内部矛盾(ICA)
-    visualize_ica(metrics['ica_ratio'], metrics['ica_by_genre'])
+    visualize_ica(metrics['ica_ratio'], metrics['ica_by_genre'], ax)
+    plt.close(fig)
     
     print('所有可视化已完成！')
 
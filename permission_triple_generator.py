@@ -1,6 +1,15 @@
+import hashlib
+import importlib.util
+import itertools
 import json
 import os
-from functools import lru_cache
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import orjson
+except ImportError:  # orjson为可选依赖，未安装时使用标准库json
+    orjson = None
 
 # 定义权限类别映射（与permission_analysis.py保持一致）
 PERMISSION_MAPPING = {
@@ -104,18 +113,44 @@ CHANNELS = {
 # 定义九个权限类别
 PERMISSION_CATEGORIES = list(PERMISSION_MAPPING.keys())
 
-# 使用缓存优化的辅助函数
-@lru_cache(maxsize=None)
-def _map_single_item(item):
-    if item in REVERSE_MAPPING:
-        return set(REVERSE_MAPPING[item])
-    # 特殊处理'App info and performance'
-    elif item == 'App info and performance':
-        return set()
+# 应用数少于该值时串行分析；并行时每个进程任务至少包含的应用数
+PARALLEL_MIN_APPS = 20000
+PARALLEL_MIN_CHUNKSIZE = 1024
+
+# 列式缓存中渠道和权限以整数编码存储，每批应用写为一个row group
+PARQUET_BATCH_APPS = 4096
+CHANNEL_CODES = {name: i for i, name in enumerate(CHANNELS.values())}
+PERMISSION_CODES = {cat: i for i, cat in enumerate(PERMISSION_CATEGORIES)}
+
+# 反向映射的不可变版本，导入时一次性构建
+REVERSE_MAPPING_FROZEN = {item: frozenset(perms) for item, perms in REVERSE_MAPPING.items()}
+
+_NO_PERMISSIONS = frozenset()
+_SENSORS_ONLY = frozenset({'Sensors'})
+
+# 单个数据项映射到权限类别
+def _map_single_item(item, _reverse=REVERSE_MAPPING_FROZEN):
+    categories = _reverse.get(item)
+    if categories is not None:
+        return categories
     # 对于传感器相关项
-    elif 'sensors' in item.lower() or 'sensor' in item.lower():
-        return {'Sensors'}
-    return set()
+    if 'sensor' in item.lower():
+        return _SENSORS_ONLY
+    return _NO_PERMISSIONS
+
+# 每个权限类别对应一个二进制位，数据项映射结果以整数位掩码表示
+CATEGORY_BITS = {cat: 1 << i for i, cat in enumerate(PERMISSION_CATEGORIES)}
+ITEM_MASKS = {item: sum(CATEGORY_BITS[cat] for cat in cats) for item, cats in REVERSE_MAPPING_FROZEN.items()}
+
+# 单个数据项映射到权限类别位掩码
+def _map_item_mask(item, _masks=ITEM_MASKS):
+    mask = _masks.get(item)
+    if mask is not None:
+        return mask
+    # 对于传感器相关项
+    if 'sensor' in item.lower():
+        return CATEGORY_BITS['Sensors']
+    return 0
 
 # 主映射函数
 def map_to_permissions(data_items):
@@ -128,6 +163,14 @@ def map_to_permissions(data_items):
 def load_json_data(file_path):
     """加载JSON数据"""
     try:
+        if orjson is not None:
+            with open(file_path, 'rb') as f:
+                data = f.read()
+            try:
+                return orjson.loads(data)
+            except orjson.JSONDecodeError:
+                # orjson不接受NaN、Infinity等标准库json允许的写法，交给标准库重新解析
+                return json.loads(data.decode('utf-8'))
         with open(file_path, 'r', encoding='utf-8') as f:
             return json.load(f)
     except FileNotFoundError:
@@ -139,8 +182,8 @@ def load_json_data(file_path):
 
 
 def analyze_permissions(app_data):
-    """分析应用数据，生成权限三元组"""
-    results = []
+    """分析应用数据，返回应用信息及其 (渠道, 权限, 状态) 三元组列表"""
+    triples = []
 
     app_info = {
         'app_name': app_data.get('name', 'unknown'),
@@ -149,120 +192,219 @@ def analyze_permissions(app_data):
     }
 
     for channel_field, channel_name in CHANNELS.items():
-        # 初始化权限存在情况为0（不存在）
-        permission_status = {cat: 0 for cat in PERMISSION_CATEGORIES}
-        # 标记是否有矛盾
-        has_conflict = {cat: False for cat in PERMISSION_CATEGORIES}
-
-        # 检查字段是否存在
+        # 检查字段是否存在，字段不存在时所有权限都标记为0
         if channel_field not in app_data:
-            # 字段不存在，所有权限都标记为0
-            for cat in PERMISSION_CATEGORIES:
-                results.append((app_info, channel_name, cat, 0))
-            continue
-
-        field_value = app_data[channel_field]
-
-        # 处理列表类型的字段
-        if isinstance(field_value, list):
-            # 存储每个权限类别对应的原始数据项
-            permission_items = {cat: [] for cat in PERMISSION_CATEGORIES}
-            for item in field_value:
-                categories = _map_single_item(item)
-                for category in categories:
-                    permission_items[category].append(item)
-                    # 如果已经标记为存在，现在又发现存在，不改变状态
-                    # 如果之前未标记，现在标记为存在
-                    if permission_status[category] == 0:
-                        permission_status[category] = 1
-                    # 如果之前标记为不存在，现在发现存在，标记为矛盾
-                    elif permission_status[category] == -1:
-                        has_conflict[category] = True
-
-            # 检查是否有矛盾
-            for cat in PERMISSION_CATEGORIES:
-                if has_conflict[cat]:
-                    results.append((app_info, channel_name, cat, -1))
-                else:
-                    results.append((app_info, channel_name, cat, permission_status[cat]))
+            mask = 0
         else:
-            # 非列表类型字段，直接检查
-            categories = _map_single_item(str(field_value))
-            for category in categories:
-                results.append((app_info, channel_name, category, 1))
-            # 对于其他未匹配的权限类别，标记为0
-            for cat in PERMISSION_CATEGORIES:
-                if cat not in categories:
-                    results.append((app_info, channel_name, cat, 0))
+            field_value = app_data[channel_field]
+            # 列表类型字段对所有数据项的位掩码按位或，非列表类型直接映射
+            if isinstance(field_value, list):
+                mask = 0
+                for item in field_value:
+                    mask |= _map_item_mask(item)
+            else:
+                mask = _map_item_mask(str(field_value))
+
+        triples.extend((channel_name, cat, 1 if mask & bit else 0)
+                       for cat, bit in CATEGORY_BITS.items())
+
+    return app_info, triples
 
-    return results
 
+def process_app_database(file_path, verbose=False):
+    """处理应用数据库，逐个生成每个应用的 (应用信息, 三元组列表)
 
-def process_app_database(file_path):
-    """处理应用数据库，生成所有应用的权限三元组"""
+    (应用名称, 应用ID, 应用类别) 相同的记录合并为一个应用，按首次出现的顺序输出
+    """
     apps_data = load_json_data(file_path)
     if not apps_data:
-        return []
+        return
 
-    all_results = []
+    # 按应用键分组后重排，同一应用的记录相邻，分析结果可以边生成边合并
+    app_groups = {}
     for app in apps_data:
-        app_id = app.get('_id', 'unknown')
-        app_name = app.get('name', 'unknown')
-        print(f"处理应用: {app_name} ({app_id})")
-        
-        app_results = analyze_permissions(app)
-        all_results.extend(app_results)
-
-    return all_results
-
-
-def save_results(results, output_file):
-    """保存结果到文件"""
-    with open(output_file, 'w', encoding='utf-8') as f:
-        # 写入CSV表头
-        f.write("应用名称,应用ID,应用类别,渠道,权限,是否存在该权限\n")
-        
-        # 按应用分组输出
-        app_results = {}
-        for result in results:
-            app_info, channel, permission, status = result
-            app_key = (app_info['app_name'], app_info['app_id'], app_info['genre'])
-            if app_key not in app_results:
-                app_results[app_key] = []
-            app_results[app_key].append((channel, permission, status))
-        
-        # 遍历每个应用并输出
-        for idx, (app_key, triples) in enumerate(app_results.items()):
-            app_name, app_id, genre = app_key
-            
-            # 应用信息
-            f.write(f"应用名称: {app_name}\n")
-            f.write(f"应用ID: {app_id}\n")
-            f.write(f"应用类别: {genre}\n")
-            f.write("权限三元组:\n")
-            
-            # 输出该应用的所有三元组
-            for channel, permission, status in triples:
-                f.write(f"{channel},{permission},{status}\n")
-            
-            # 在应用之间添加分隔线 (除了最后一个应用)
-            if idx < len(app_results) - 1:
-                f.write("--------------------------------------------------\n")
+        app_key = (app.get('name', 'unknown'), app.get('_id', 'unknown'), app.get('genre', 'unknown'))
+        if app_key not in app_groups:
+            app_groups[app_key] = []
+        app_groups[app_key].append(app)
+    apps_data = [app for group in app_groups.values() for app in group]
+
+    # 单个应用的分析很快，进程间传递数据的开销可能超过并行的收益：
+    # 单核或应用较少时直接串行处理，否则分成较大的批次分发到多个进程
+    workers = os.cpu_count() or 1
+    if workers <= 1 or len(apps_data) < PARALLEL_MIN_APPS:
+        results = map(analyze_permissions, apps_data)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        chunksize = max(PARALLEL_MIN_CHUNKSIZE, len(apps_data) // (workers * 4))
+        results = executor.map(analyze_permissions, apps_data, chunksize=chunksize)
+
+    try:
+        for group in app_groups.values():
+            app_info, triples = None, []
+            for app, app_results in zip(group, results):
+                if verbose:
+                    print(f"处理应用: {app.get('name', 'unknown')} ({app.get('_id', 'unknown')})")
+                app_info = app_info or app_results[0]
+                triples.extend(app_results[1])
+
+            yield app_info, triples
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+
+def save_results(app_results, output_file):
+    """逐个应用保存结果到文件，同时按批写入列式缓存，返回写入的三元组数量"""
+    cache_file = os.path.splitext(output_file)[0] + '.parquet'
+    writer = open_parquet_cache(cache_file)
+    batch, batch_start = new_cache_batch(), 0
+    total = 0
+
+    try:
+        with open(output_file, 'w', encoding='utf-8') as f:
+            # 写入CSV表头
+            f.write("应用名称,应用ID,应用类别,渠道,权限,是否存在该权限\n")
+
+            for idx, (app_info, triples) in enumerate(app_results):
+                app_name, app_id, genre = app_info['app_name'], app_info['app_id'], app_info['genre']
+
+                # 在应用之间添加分隔线
+                if idx > 0:
+                    f.write("--------------------------------------------------\n")
+
+                # 应用信息
+                f.write(f"应用名称: {app_name}\n")
+                f.write(f"应用ID: {app_id}\n")
+                f.write(f"应用类别: {genre}\n")
+                f.write("权限三元组:\n")
+
+                # 输出该应用的所有三元组
+                for channel, permission, status in triples:
+                    f.write(f"{channel},{permission},{status}\n")
+                total += len(triples)
+
+                if writer is None:
+                    continue
+                # 列式缓存：应用信息每个应用只存一次，三元组存为int8编码，攒满一批后写出
+                batch['app_name'].append(str(app_name))
+                batch['app_id'].append(str(app_id))
+                batch['genre'].append(str(genre))
+                batch['count'].append(len(triples))
+                for channel, permission, status in triples:
+                    batch['channel'].append(CHANNEL_CODES[channel])
+                    batch['permission'].append(PERMISSION_CODES[permission])
+                    batch['status'].append(status)
+                if len(batch['count']) >= PARQUET_BATCH_APPS:
+                    write_cache_batch(writer, batch, batch_start)
+                    batch, batch_start = new_cache_batch(), idx + 1
+
+        if writer is not None and batch['count']:
+            write_cache_batch(writer, batch, batch_start)
+    finally:
+        if writer is not None:
+            writer.close()
     print(f"结果已保存到 {output_file}")
+    if writer is not None:
+        print(f"列式缓存已保存到 {cache_file}")
+    return total
+
+
+def new_cache_batch():
+    """一批应用的列式缓存数据"""
+    return {
+        'app_name': [], 'app_id': [], 'genre': [], 'count': [],
+        'channel': array('b'), 'permission': array('b'), 'status': array('b')
+    }
+
+
+def open_parquet_cache(output_file):
+    """打开Parquet增量写入器，未安装pyarrow或numpy时返回None（跳过缓存）"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        pq = None
+    # 写入批次时还需要numpy，这里只检查是否已安装
+    if pq is None or importlib.util.find_spec('numpy') is None:
+        print(f"警告: 未安装Parquet引擎(pyarrow)或numpy，跳过保存 {output_file}")
+        return None
+
+    schema = pa.schema([
+        ('app_idx', pa.int64()),
+        ('app_name', pa.string()),
+        ('app_id', pa.string()),
+        ('genre', pa.string()),
+        ('channel', pa.dictionary(pa.int8(), pa.string())),
+        ('permission', pa.dictionary(pa.int8(), pa.string())),
+        ('status', pa.int8())
+    ])
+    return pq.ParquetWriter(output_file, schema, compression='zstd')
+
+
+def write_cache_batch(writer, batch, first_app_idx):
+    """将一批应用写为Parquet的一个row group，应用信息按各应用的三元组数量展开"""
+    import numpy as np
+    import pyarrow as pa
+
+    app_pos = np.repeat(np.arange(len(batch['count'])), batch['count'])
+    table = pa.table({
+        'app_idx': app_pos + first_app_idx,
+        'app_name': pa.array(batch['app_name'], pa.string()).take(app_pos),
+        'app_id': pa.array(batch['app_id'], pa.string()).take(app_pos),
+        'genre': pa.array(batch['genre'], pa.string()).take(app_pos),
+        'channel': pa.DictionaryArray.from_arrays(np.frombuffer(batch['channel'], dtype=np.int8),
+                                                  list(CHANNELS.values())),
+        'permission': pa.DictionaryArray.from_arrays(np.frombuffer(batch['permission'], dtype=np.int8),
+                                                     PERMISSION_CATEGORIES),
+        'status': np.frombuffer(batch['status'], dtype=np.int8)
+    }, schema=writer.schema)
+    writer.write_table(table)
+
+
+def file_fingerprint(file_path):
+    """计算文件内容的BLAKE2b摘要，用于判断输入是否变化"""
+    h = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def is_output_up_to_date(input_file, output_file, fingerprint_file):
+    """输出文件比输入文件新且记录的输入摘要一致时，无需重新生成"""
+    if not (os.path.exists(input_file) and os.path.exists(output_file) and os.path.exists(fingerprint_file)):
+        return False
+    if os.path.getmtime(output_file) < os.path.getmtime(input_file):
+        return False
+    with open(fingerprint_file, 'r', encoding='utf-8') as f:
+        return f.read().strip() == file_fingerprint(input_file)
 
 
 def main():
     # 定义文件路径
     input_file = 'app_database.json'
     output_file = 'permission_triples.txt'
+    fingerprint_file = output_file + '.fp'
 
-    # 处理数据
-    results = process_app_database(input_file)
+    # 输入未变化时直接复用已有结果
+    if is_output_up_to_date(input_file, output_file, fingerprint_file):
+        print(f"输入文件 {input_file} 未变化，跳过生成（复用 {output_file}）")
+        return
+
+    # 处理数据，逐个应用生成结果
+    app_results = process_app_database(input_file)
+    first_app = next(app_results, None)
 
     # 保存结果
-    if results:
-        save_results(results, output_file)
-        print(f"共生成 {len(results)} 个权限三元组")
+    if first_app is not None:
+        total = save_results(itertools.chain([first_app], app_results), output_file)
+        print(f"共生成 {total} 个权限三元组")
+
+        # 记录本次输入的摘要
+        with open(fingerprint_file, 'w', encoding='utf-8') as f:
+            f.write(file_fingerprint(input_file))
     else:
         print("未生成任何权限三元组")
 
@@ -1,14 +1,32 @@
 import json
 import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
+import matplotlib
+matplotlib.use('Agg')  # 仅输出图片文件，使用非交互式后端（绘图进程中同样适用）
 import matplotlib.pyplot as plt
-import seaborn as sns
+from matplotlib import font_manager
+from PIL import Image
 import plotly.express as px
 import plotly.graph_objects as go
-from collections import defaultdict, Counter
+from collections import Counter
+
+
+def _resolve_font(families):
+    """从候选字体中找出第一个已安装的字体并注册，避免每次绘图重新遍历候选列表"""
+    for family in families:
+        try:
+            font_path = font_manager.findfont(family, fallback_to_default=False)
+        except ValueError:
+            continue
+        font_manager.fontManager.addfont(font_path)
+        return [font_manager.FontProperties(fname=font_path).get_name()]
+    return families
+
 
 # 设置中文字体
-plt.rcParams["font.family"] = ["SimHei", "WenQuanYi Micro Hei", "Heiti TC"]
+plt.rcParams["font.family"] = _resolve_font(["SimHei", "WenQuanYi Micro Hei", "Heiti TC"])
 plt.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
 
 # Android官方定义的危险权限
@@ -24,6 +42,30 @@ ANDROID_DANGEROUS_PERMISSIONS = {
     'Sensors': True  # 部分传感器权限属于危险权限
 }
 
+# 三个渠道的固定顺序
+CHANNEL_NAMES = ['渠道一', '渠道二', '渠道三']
+
+# 渠道状态表中表示该渠道无记录的占位值
+STATUS_MISSING = 127
+
+# 三元组总表的列及类型，低基数字符串列使用分类类型存储
+TRIPLE_COLUMN_DTYPES = {
+    'app_idx': 'int32',
+    'app_name': 'category',
+    'genre': 'category',
+    'channel': 'category',
+    'permission': 'category',
+    'status': 'int8'
+}
+
+# 应用信息行的字段名及其对应的键（“权限三元组:”行无需处理）
+APP_INFO_FIELDS = {
+    '应用名称': 'app_name',
+    '应用ID': 'app_id',
+    '应用类别': 'genre',
+    '权限三元组': None
+}
+
 # 权限敏感度映射 (1-5，5为最高敏感)
 PERMISSION_SENSITIVITY = {
     'Location': 5,
@@ -37,93 +79,164 @@ PERMISSION_SENSITIVITY = {
     'Sensors': 3
 }
 
+# 导入时一次性构建的派生常量：权限的固定顺序及编码、按编码排列的敏感度、危险权限集合
+PERM_ORDER = list(PERMISSION_SENSITIVITY)
+PERM_TO_CODE = {p: i for i, p in enumerate(PERM_ORDER)}
+SENSITIVITY_ARR = np.array([PERMISSION_SENSITIVITY[p] for p in PERM_ORDER], dtype=np.int8)
+DANGEROUS_SET = frozenset(k for k, v in ANDROID_DANGEROUS_PERMISSIONS.items() if v)
+
+
+def _sensitivity_of(permissions):
+    """按权限编码查表得到敏感度，未定义的权限敏感度为0"""
+    codes = np.fromiter((PERM_TO_CODE.get(p, -1) for p in permissions), dtype=np.intp, count=len(permissions))
+    return np.where(codes >= 0, np.take(SENSITIVITY_ARR, codes), 0)
+
+
+def _parse_triple(line):
+    """解析三元组行，字段数不足或状态不是整数时返回None"""
+    try:
+        channel, permission, status = line.split(',', 2)
+        return channel, permission, int(status)
+    except ValueError:
+        return None
+
 
 def load_triple_data(file_path):
-    """加载权限三元组数据"""
+    """加载权限三元组数据，解析时记录每个三元组的编号，最后一次性构建三元组总表"""
     apps_data = []
     current_app = {}
-    triples = []
-    header = None
+    # 不同的三元组行只解析一次：triple_codes 记录每行对应的编号（无效行为-1），unique_triples 按编号存放解析结果
+    triple_codes = {}
+    unique_triples = []
+    # 三元组编号及所属应用的并列列表，尚未归属应用的三元组位于列表末尾，保存应用时记入其编号
+    codes, app_ids = [], []
+    pending = 0
 
     with open(file_path, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
+        # 跳过CSV表头（首行不是表头时回到文件开头）
+        first_line = f.readline()
+        if ',' not in first_line:
+            f.seek(0)
         
-        # 跳过CSV表头
-        if lines and ',' in lines[0]:
-            lines = lines[1:]
-        
-        for line in lines:
+        # 逐行读取，避免一次性载入整个文件
+        for line in f:
             line = line.strip()
             if not line:
                 continue
             
-            if line.startswith('应用名称:'):
-                # 如果已有当前应用数据，先保存
-                if current_app and triples:
-                    current_app['triples'] = triples
-                    apps_data.append(current_app)
-                    triples = []
-                
-                # 开始新应用
-                current_app = {
-                    'app_name': line.replace('应用名称:', '').strip(),
-                    'app_id': '',
-                    'genre': ''
-                }
-            elif line.startswith('应用ID:'):
-                current_app['app_id'] = line.replace('应用ID:', '').strip()
-            elif line.startswith('应用类别:'):
-                current_app['genre'] = line.replace('应用类别:', '').strip()
-            elif line.startswith('权限三元组:'):
-                continue
-            elif line.startswith('---'):
+            if line.startswith('---'):
                 # 应用结束，保存数据
-                if current_app and triples:
-                    current_app['triples'] = triples
+                if current_app and pending:
                     apps_data.append(current_app)
+                    app_ids.extend([len(apps_data) - 1] * pending)
                     current_app = {}
-                    triples = []
+                    pending = 0
+                continue
+            
+            # 按首个冒号拆分，根据字段名分派
+            key, sep, value = line.partition(':')
+            if sep and key in APP_INFO_FIELDS:
+                field = APP_INFO_FIELDS[key]
+                if field == 'app_name':
+                    # 如果已有当前应用数据，先保存
+                    if current_app and pending:
+                        apps_data.append(current_app)
+                        app_ids.extend([len(apps_data) - 1] * pending)
+                        pending = 0
+                    
+                    # 开始新应用
+                    current_app = {
+                        'app_name': value.strip(),
+                        'app_id': '',
+                        'genre': ''
+                    }
+                elif field:
+                    current_app[field] = value.strip()
             elif ',' in line:
-                # 解析三元组
-                parts = line.split(',')
-                if len(parts) == 3:
-                    channel, permission, status = parts
-                    try:
-                        status = int(status)
-                        triples.append({
-                            'channel': channel,
-                            'permission': permission,
-                            'status': status
-                        })
-                    except ValueError:
-                        continue
+                code = triple_codes.get(line)
+                if code is None:
+                    triple = _parse_triple(line)
+                    code = -1 if triple is None else len(unique_triples)
+                    if triple is not None:
+                        unique_triples.append(triple)
+                    triple_codes[line] = code
+                # 字段数不足或状态不是整数的行跳过
+                if code < 0:
+                    continue
+                codes.append(code)
+                pending += 1
     
     # 保存最后一个应用
-    if current_app and triples:
-        current_app['triples'] = triples
+    if current_app and pending:
         apps_data.append(current_app)
-    
-    return apps_data
+        app_ids.extend([len(apps_data) - 1] * pending)
+    
+    # 最后一个应用之后未归属的三元组不计入，其余按编号一次性取出各字段
+    codes = np.asarray(codes[:len(app_ids)], dtype=np.int64)
+    channels = np.array([triple[0] for triple in unique_triples], dtype=object)
+    permissions = np.array([triple[1] for triple in unique_triples], dtype=object)
+    statuses = np.array([triple[2] for triple in unique_triples], dtype=np.int64)
+    return build_triples_frame(apps_data, app_ids, channels[codes], permissions[codes], statuses[codes])
+
+
+def build_triples_frame(apps_data, app_ids, channels, permissions, statuses):
+    """由并列的数组构建三元组总表，每行对应一个三元组"""
+    app_idx = np.asarray(app_ids, dtype=np.int64)
+    app_names = np.array([app.get('app_name', '') for app in apps_data], dtype=object)
+    genres = np.array([app.get('genre', '') for app in apps_data], dtype=object)
+    triples_df = pd.DataFrame({
+        'app_idx': app_idx,
+        'app_name': app_names[app_idx],
+        'genre': genres[app_idx],
+        'channel': channels,
+        'permission': permissions,
+        'status': np.array(statuses, dtype=np.int8)
+    }).astype(TRIPLE_COLUMN_DTYPES)
+
+    # 渠道按固定顺序排列，透视后的列无需再排序
+    channels = triples_df['channel'].cat.categories
+    triples_df['channel'] = triples_df['channel'].cat.set_categories(
+        CHANNEL_NAMES + [c for c in channels if c not in CHANNEL_NAMES])
+    return triples_df
+
+
+def select_collected(triples_df):
+    """筛选渠道一中状态为1的三元组（表示应用收集了该权限）"""
+    return triples_df[(triples_df['channel'] == '渠道一') & (triples_df['status'] == 1)]
+
+
+def count_collected_permissions(collected):
+    """统计各权限被收集的次数，按首次出现的顺序排列"""
+    return collected.groupby('permission', sort=False, observed=True).size()
+
+
+def compute_all_aggregates(triples_df):
+    """一次性计算各项分析共用的中间结果，后续分析只使用这些较小的汇总表"""
+    # 渠道一中收集的权限只筛选一次
+    collected = select_collected(triples_df)
+    # 每个应用一行：应用编号、名称和类别
+    apps = triples_df.drop_duplicates('app_idx')[['app_idx', 'app_name', 'genre']]
+    return {
+        'collected': collected,
+        'permission_counts': count_collected_permissions(collected),
+        'dangerous_mask': collected['permission'].isin(DANGEROUS_SET).to_numpy(),
+        'channel_status': pivot_channel_status(triples_df),
+        'apps': apps,
+        'genre_app_counts': apps.groupby('genre', sort=False, observed=True).size()
+    }
 
 
-def analyze_permission_frequency(apps_data):
+def analyze_permission_frequency(permission_counts):
     """权限使用频率分析"""
     # 统计所有应用中收集次数最多的权限
-    permission_counter = Counter()
-    for app in apps_data:
-        for triple in app['triples']:
-            # 只统计渠道一中状态为1的权限（表示收集）
-            if triple['channel'] == '渠道一' and triple['status'] == 1:
-                permission_counter[triple['permission']] += 1
+    permission_counter = Counter(permission_counts.to_dict())
     
     # 排序并返回前N个高频权限
-    top_permissions = permission_counter.most_common(10)
+    top_permissions = list(permission_counts.sort_values(ascending=False, kind='stable').head(10).items())
     
     # 高风险权限集群（敏感权限且使用频率高）
-    high_risk_permissions = []
-    for permission, count in permission_counter.items():
-        if PERMISSION_SENSITIVITY.get(permission, 0) >= 4 and count > 10:
-            high_risk_permissions.append((permission, count))
+    high_risk = (_sensitivity_of(permission_counts.index) >= 4) & (permission_counts.to_numpy() > 10)
+    high_risk_permissions = list(permission_counts[high_risk].items())
     
     return {
         'top_permissions': top_permissions,
@@ -132,17 +245,10 @@ def analyze_permission_frequency(apps_data):
     }
 
 
-def analyze_dangerous_permissions(apps_data):
+def analyze_dangerous_permissions(dangerous_mask):
     """分析危险权限占比"""
-    total_dangerous = 0
-    total_collected = 0
-    
-    for app in apps_data:
-        for triple in app['triples']:
-            if triple['channel'] == '渠道一' and triple['status'] == 1:
-                total_collected += 1
-                if ANDROID_DANGEROUS_PERMISSIONS.get(triple['permission'], False):
-                    total_dangerous += 1
+    total_dangerous = int(dangerous_mask.sum())
+    total_collected = len(dangerous_mask)
     
     dangerous_ratio = (total_dangerous / total_collected) * 100 if total_collected > 0 else 0
     
@@ -153,61 +259,66 @@ def analyze_dangerous_permissions(apps_data):
     }
 
 
-def analyze_channel_consistency(apps_data):
+def pivot_channel_status(triples_df):
+    """按 (应用, 权限) 透视各渠道的状态（int8，无记录为STATUS_MISSING），行按首次出现的顺序排列"""
+    permission, channel = triples_df['permission'].cat, triples_df['channel'].cat
+    valid = ((permission.codes >= 0) & (channel.codes >= 0)).to_numpy()
+    perm_code = permission.codes.to_numpy(np.int64)[valid]
+    chan_code = channel.codes.to_numpy(np.int64)[valid]
+    status = triples_df['status'].to_numpy()[valid]
+    n_perms, n_channels = len(permission.categories), len(channel.categories)
+    
+    # (应用, 权限) 按首次出现的顺序编号
+    row, pairs = pd.factorize(triples_df['app_idx'].to_numpy(np.int64)[valid] * n_perms + perm_code)
+    
+    # 同一 (行, 渠道) 只保留最后一条记录后写入稠密表
+    key = row * n_channels + chan_code
+    _, last_from_end = np.unique(key[::-1], return_index=True)
+    last = len(key) - 1 - last_from_end
+    table = np.full((len(pairs), n_channels), STATUS_MISSING, dtype=np.int8)
+    table[row[last], chan_code[last]] = status[last]
+    
+    index = pd.MultiIndex.from_arrays(
+        [pairs // n_perms, pd.Categorical.from_codes(pairs % n_perms, permission.categories)],
+        names=['app_idx', 'permission'])
+    columns = pd.CategoricalIndex(channel.categories, categories=channel.categories, name='channel')
+    channel_status = pd.DataFrame(table, index=index, columns=columns)
+    # 与按渠道透视的结果一致，只保留出现过的渠道
+    return channel_status.loc[:, (table != STATUS_MISSING).any(axis=0)]
+
+
+def analyze_channel_consistency(apps, channel_status):
     """分析渠道间一致性"""
-    # 三重一致性验证
-    triple_consistent_count = 0
-    total_permissions = 0
+    # 三重一致性验证：三个渠道都存在且状态一致（不为-1）
+    table = channel_status.to_numpy()
+    recorded = table != STATUS_MISSING
+    # 占位值大于所有状态值，取最小值时无需屏蔽；取最大值时屏蔽为int8最小值
+    lowest = table.min(axis=1, initial=STATUS_MISSING)
+    highest = np.where(recorded, table, np.iinfo(np.int8).min).max(axis=1, initial=np.iinfo(np.int8).min)
+    consistent = pd.Series((recorded.sum(axis=1) == 3) & (lowest == highest) & (lowest != -1),
+                           index=channel_status.index)
     
     # 按权限分组统计一致性
-    permission_consistency = defaultdict(lambda: {'consistent': 0, 'total': 0})
+    by_permission = consistent.groupby(level='permission', sort=False, observed=True).agg(['sum', 'size'])
+    permission_consistency = {
+        permission: {
+            'consistent': int(row['sum']),
+            'total': int(row['size']),
+            'ratio': (row['sum'] / row['size']) * 100
+        }
+        for permission, row in by_permission.iterrows()
+    }
     
     # 应用级一致性
-    app_consistency = []
-    
-    for app in apps_data:
-        app_name = app['app_name']
-        app_triples = app['triples']
-        
-        # 按权限分组
-        permission_channels = defaultdict(dict)
-        for triple in app_triples:
-            channel = triple['channel']
-            permission = triple['permission']
-            status = triple['status']
-            permission_channels[permission][channel] = status
-        
-        # 计算应用级一致性
-        app_consistent = 0
-        app_total = 0
-        
-        for permission, channels in permission_channels.items():
-            total_permissions += 1
-            permission_consistency[permission]['total'] += 1
-            app_total += 1
-            
-            # 检查三个渠道是否都存在且状态一致
-            if len(channels) == 3:
-                statuses = list(channels.values())
-                if all(s == statuses[0] for s in statuses) and statuses[0] != -1:
-                    triple_consistent_count += 1
-                    permission_consistency[permission]['consistent'] += 1
-                    app_consistent += 1
-        
-        # 计算应用级一致性比例
-        if app_total > 0:
-            app_consistency.append({
-                'app_name': app_name,
-                'consistency_ratio': (app_consistent / app_total) * 100
-            })
+    app_ratios = consistent.groupby(level='app_idx', sort=True).mean() * 100
+    app_names = apps.set_index('app_idx')['app_name'].reindex(app_ratios.index)
+    app_consistency = [
+        {'app_name': app_name, 'consistency_ratio': ratio}
+        for app_name, ratio in zip(app_names.tolist(), app_ratios.to_numpy().tolist())
+    ]
     
     # 计算总体三重一致性比例
-    triple_consistency_ratio = (triple_consistent_count / total_permissions) * 100 if total_permissions > 0 else 0
-    
-    # 计算每个权限的一致性比例
-    for permission in permission_consistency:
-        data = permission_consistency[permission]
-        data['ratio'] = (data['consistent'] / data['total']) * 100 if data['total'] > 0 else 0
+    triple_consistency_ratio = consistent.mean() * 100 if len(consistent) > 0 else 0
     
     return {
         'triple_consistency_ratio': triple_consistency_ratio,
@@ -216,55 +327,31 @@ def analyze_channel_consistency(apps_data):
     }
 
 
-def prepare_heatmap_data(apps_data):
+def prepare_heatmap_data(permission_counts):
     """准备热力图数据：权限使用频率 vs 敏感度"""
-    # 统计权限使用频率
-    permission_counter = Counter()
-    for app in apps_data:
-        for triple in app['triples']:
-            if triple['channel'] == '渠道一' and triple['status'] == 1:
-                permission_counter[triple['permission']] += 1
+    # 权限使用频率，归一化时使用的最大频率只需计算一次
+    frequency = permission_counts.reindex(pd.Index(PERM_ORDER, dtype=object), fill_value=0)
+    max_freq = permission_counts.max() if len(permission_counts) else 1
     
     # 准备热力图数据
-    heatmap_data = []
-    for permission in PERMISSION_SENSITIVITY:
-        frequency = permission_counter.get(permission, 0)
-        sensitivity = PERMISSION_SENSITIVITY[permission]
-        
-        # 归一化频率 (0-1)
-        max_freq = max(permission_counter.values()) if permission_counter else 1
-        normalized_freq = frequency / max_freq
-        
-        heatmap_data.append({
-            'permission': permission,
-            'frequency': frequency,
-            'sensitivity': sensitivity,
-            'normalized_freq': normalized_freq
-        })
+    heatmap_data = pd.DataFrame({
+        'permission': PERM_ORDER,
+        'frequency': frequency.to_numpy(),
+        'sensitivity': SENSITIVITY_ARR
+    })
+    
+    # 归一化频率 (0-1)
+    heatmap_data['normalized_freq'] = heatmap_data['frequency'] / max_freq
     
-    return pd.DataFrame(heatmap_data)
+    return heatmap_data
 
 
-def prepare_sankey_data(apps_data):
+def prepare_sankey_data(channel_status):
     """准备桑基图数据：权限流动路径"""
-    # 统计渠道间权限状态变化
-    flow_counts = defaultdict(int)
-    
-    for app in apps_data:
-        # 按权限和应用分组
-        permission_status = defaultdict(dict)
-        for triple in app['triples']:
-            permission_status[triple['permission']][triple['channel']] = triple['status']
-        
-        # 检查三个渠道的状态
-        for permission, channels in permission_status.items():
-            if '渠道一' in channels and '渠道二' in channels and '渠道三' in channels:
-                flow_key = (
-                    channels['渠道一'],
-                    channels['渠道二'],
-                    channels['渠道三']
-                )
-                flow_counts[flow_key] += 1
+    # 统计渠道间权限状态变化：只计三个渠道都存在的 (应用, 权限)
+    flows = channel_status.reindex(columns=CHANNEL_NAMES, fill_value=STATUS_MISSING)
+    flows = flows[(flows != STATUS_MISSING).all(axis=1)]
+    flow_counts = flows.groupby(CHANNEL_NAMES, sort=False).size()
     
     # 准备桑基图数据
     labels = ['0', '1', '-1']
@@ -302,146 +389,139 @@ def prepare_sankey_data(apps_data):
     }
 
 
-def prepare_radar_data(apps_data, top_n=5):
+def prepare_radar_data(genre_app_counts, collected, top_n=5):
     """准备雷达图数据：应用权限策略多维对比"""
-    # 按应用类别分组
-    genre_apps = defaultdict(list)
-    for app in apps_data:
-        genre_apps[app['genre']].append(app)
-    
     # 选择应用数量最多的前N个类别
-    top_genres = sorted(genre_apps.keys(), key=lambda x: len(genre_apps[x]), reverse=True)[:top_n]
+    top_counts = genre_app_counts.sort_values(ascending=False, kind='stable').head(top_n)
+    top_genres = list(top_counts.index)
     
-    # 准备雷达图数据
-    radar_data = []
-    for genre in top_genres:
-        apps = genre_apps[genre]
-        
-        # 统计该类别的权限使用情况
-        permission_usage = defaultdict(int)
-        total_apps = len(apps)
-        
-        for app in apps:
-            for triple in app['triples']:
-                if triple['channel'] == '渠道一' and triple['status'] == 1:
-                    permission_usage[triple['permission']] += 1
-        
-        # 计算每个权限的使用比例
-        for permission in PERMISSION_SENSITIVITY:
-            usage_ratio = (permission_usage.get(permission, 0) / total_apps) * 100
-            radar_data.append({
-                'genre': genre,
-                'permission': permission,
-                'usage_ratio': usage_ratio
-            })
+    # 统计各类别的权限使用情况
+    top_collected = collected[collected['genre'].isin(top_genres)]
+    usage = top_collected.groupby(['genre', 'permission'], observed=True).size().unstack(fill_value=0)
+    usage = usage.reindex(index=top_genres, columns=PERM_ORDER, fill_value=0)
     
-    return pd.DataFrame(radar_data)
+    # 计算每个权限的使用比例，并展开为长表
+    ratios = usage.div(top_counts.to_numpy(), axis=0) * 100
+    return pd.DataFrame({
+        'genre': np.repeat(top_genres, ratios.shape[1]),
+        'permission': np.tile(PERM_ORDER, len(top_genres)),
+        'usage_ratio': ratios.to_numpy().ravel()
+    })
 
 
-def prepare_genre_comparison_data(apps_data):
+def prepare_genre_comparison_data(apps, collected):
     """准备同类应用权限策略差异数据"""
-    # 按应用类别分组
-    genre_apps = defaultdict(list)
-    for app in apps_data:
-        genre_apps[app['genre']].append(app)
+    # 每个应用收集的权限表示为布尔矩阵 app_permissions[应用, 权限]，权限数量不受限制
+    codes, permissions = pd.factorize(collected['permission'])
+    n_apps = int(apps['app_idx'].max()) + 1 if len(apps) else 0
+    app_permissions = np.zeros((n_apps, len(permissions)), dtype=bool)
+    app_permissions[collected['app_idx'].to_numpy(), codes] = True
     
-    # 选择应用数量较多的类别
+    # 选择应用数量较多的类别，同一类别内重名应用只保留最后一个
     comparison_data = []
-    for genre, apps in genre_apps.items():
-        if len(apps) < 5:  # 至少需要5个应用进行比较
+    for genre, genre_apps in apps.groupby('genre', sort=False, observed=True):
+        if len(genre_apps) < 5:  # 至少需要5个应用进行比较
             continue
         
-        # 统计每个应用的权限使用情况
-        app_permissions = {}
-        for app in apps:
-            app_name = app['app_name']
-            permissions = set()
-            for triple in app['triples']:
-                if triple['channel'] == '渠道一' and triple['status'] == 1:
-                    permissions.add(triple['permission'])
-            app_permissions[app_name] = permissions
-        
         # 计算权限交集和并集
-        all_permissions = set.union(*app_permissions.values()) if app_permissions else set()
-        common_permissions = set.intersection(*app_permissions.values()) if len(app_permissions) > 1 else all_permissions
+        rows = app_permissions[genre_apps.drop_duplicates('app_name', keep='last')['app_idx'].to_numpy()]
+        all_mask = np.logical_or.reduce(rows, axis=0)
+        common_mask = np.logical_and.reduce(rows, axis=0)
+        common_permissions = set(permissions[common_mask])
+        common_count = int(common_mask.sum())
+        total_permissions = int(all_mask.sum())
         
         comparison_data.append({
             'genre': genre,
-            'app_count': len(apps),
+            'app_count': len(genre_apps),
             'common_permissions': common_permissions,
-            'common_count': len(common_permissions),
-            'total_permissions': len(all_permissions),
-            'common_ratio': (len(common_permissions) / len(all_permissions)) * 100 if all_permissions else 0
+            'common_count': common_count,
+            'total_permissions': total_permissions,
+            'common_ratio': (common_count / total_permissions) * 100 if total_permissions else 0
         })
     
     return comparison_data
 
 
-def visualize_permission_frequency(top_permissions, output_file='viz_permission_frequency.png'):
+def _prepare_axes(fig, figsize=(12, 6)):
+    """清空复用的画布（包括上一张图的颜色条），设置尺寸后返回新的坐标轴"""
+    fig.clear()
+    fig.set_size_inches(figsize)
+    return fig.add_subplot()
+
+
+def _bar_colors(cmap_name, count):
+    """从色图中均匀取出柱状图各柱的颜色（避开色图两端的极值色）"""
+    return plt.get_cmap(cmap_name)(np.linspace(0, 1, count + 2)[1:-1])
+
+
+def _fast_savefig(fig, output_file):
+    """直接取出Agg画布的RGBA像素，以低压缩级别编码为PNG（布局已由constrained_layout处理）"""
+    fig.canvas.draw()
+    Image.fromarray(np.asarray(fig.canvas.buffer_rgba())).save(output_file, format='PNG', compress_level=1)
+
+
+def visualize_permission_frequency(top_permissions, fig, output_file='viz_permission_frequency.png'):
     """可视化权限使用频率"""
     permissions, counts = zip(*top_permissions)
     
-    plt.figure(figsize=(12, 6))
-    sns.barplot(x=list(permissions), y=list(counts), palette='viridis')
-    plt.title('应用收集次数最多的权限Top 10')
-    plt.xlabel('权限类别')
-    plt.ylabel('收集次数')
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    plt.savefig(output_file)
-    plt.close()
+    ax = _prepare_axes(fig)
+    ax.bar(permissions, counts, color=_bar_colors('viridis', len(permissions)), rasterized=True)
+    ax.set_title('应用收集次数最多的权限Top 10')
+    ax.set_xlabel('权限类别')
+    ax.set_ylabel('收集次数')
+    ax.tick_params(axis='x', labelrotation=45)
+    _fast_savefig(fig, output_file)
     print(f'权限使用频率图已保存为 {output_file}')
 
 
-def visualize_dangerous_permissions(dangerous_ratio, output_file='viz_dangerous_permissions.png'):
+def visualize_dangerous_permissions(dangerous_ratio, fig, output_file='viz_dangerous_permissions.png'):
     """可视化危险权限占比"""
     labels = ['危险权限', '非危险权限']
     sizes = [dangerous_ratio, 100 - dangerous_ratio]
     colors = ['red', 'green']
     
-    plt.figure(figsize=(8, 8))
-    plt.pie(sizes, labels=labels, colors=colors, autopct='%1.1f%%', startangle=90)
-    plt.axis('equal')  # 确保饼图是圆的
-    plt.title('危险权限占总收集权限的比例')
-    plt.savefig(output_file)
-    plt.close()
+    ax = _prepare_axes(fig, figsize=(8, 8))
+    ax.pie(sizes, labels=labels, colors=colors, autopct='%1.1f%%', startangle=90)
+    ax.axis('equal')  # 确保饼图是圆的
+    ax.set_title('危险权限占总收集权限的比例')
+    _fast_savefig(fig, output_file)
     print(f'危险权限占比图已保存为 {output_file}')
 
 
-def visualize_channel_consistency(consistency_data, output_file='viz_channel_consistency.png'):
+def visualize_channel_consistency(consistency_data, fig, output_file='viz_channel_consistency.png'):
     """可视化渠道间一致性"""
     # 权限一致性条形图
     permission_consistency = consistency_data['permission_consistency']
     permissions = list(permission_consistency.keys())
     ratios = [permission_consistency[p]['ratio'] for p in permissions]
     
-    plt.figure(figsize=(12, 6))
-    sns.barplot(x=permissions, y=ratios, palette='coolwarm')
-    plt.title('各权限的渠道间一致性比例')
-    plt.xlabel('权限类别')
-    plt.ylabel('一致性比例 (%)')
-    plt.xticks(rotation=45)
-    plt.axhline(y=consistency_data['triple_consistency_ratio'], color='r', linestyle='--', label=f'总体一致性: {consistency_data["triple_consistency_ratio"]:.1f}%')
-    plt.legend()
-    plt.tight_layout()
-    plt.savefig(output_file)
-    plt.close()
+    ax = _prepare_axes(fig)
+    ax.bar(permissions, ratios, color=_bar_colors('coolwarm', len(permissions)), rasterized=True)
+    ax.set_title('各权限的渠道间一致性比例')
+    ax.set_xlabel('权限类别')
+    ax.set_ylabel('一致性比例 (%)')
+    ax.tick_params(axis='x', labelrotation=45)
+    ax.axhline(y=consistency_data['triple_consistency_ratio'], color='r', linestyle='--', label=f'总体一致性: {consistency_data["triple_consistency_ratio"]:.1f}%')
+    ax.legend()
+    _fast_savefig(fig, output_file)
     print(f'渠道间一致性图已保存为 {output_file}')
 
 
-def visualize_heatmap(heatmap_df, output_file='viz_permission_heatmap.png'):
+def visualize_heatmap(heatmap_df, fig, output_file='viz_permission_heatmap.png'):
     """可视化权限使用频率 vs 敏感度热力图"""
     # 重塑数据为矩阵形式
     heatmap_matrix = heatmap_df.pivot(index='permission', columns='sensitivity', values='normalized_freq')
     
-    plt.figure(figsize=(12, 8))
-    sns.heatmap(heatmap_matrix, annot=True, cmap='YlOrRd', fmt='.2f')
-    plt.title('权限使用频率 vs 敏感度热力图')
-    plt.xlabel('敏感度 (1-5)')
-    plt.ylabel('权限类别')
-    plt.tight_layout()
-    plt.savefig(output_file)
-    plt.close()
+    ax = _prepare_axes(fig, figsize=(12, 8))
+    # seaborn导入较慢，仅在此处使用时导入
+    import seaborn as sns
+    sns.heatmap(heatmap_matrix, annot=True, cmap='YlOrRd', fmt='.2f', ax=ax)
+    ax.set_title('权限使用频率 vs 敏感度热力图')
+    ax.set_xlabel('敏感度 (1-5)')
+    ax.set_ylabel('权限类别')
+    ax.tick_params(axis='y', labelrotation=0)
+    _fast_savefig(fig, output_file)
     print(f'权限热力图已保存为 {output_file}')
 
 
@@ -479,70 +559,97 @@ def visualize_radar(radar_df, output_file='viz_permission_radar.html'):
     print(f'权限雷达图已保存为 {output_file}')
 
 
-def visualize_genre_comparison(comparison_data, output_file='viz_genre_comparison.png'):
+def visualize_genre_comparison(comparison_data, fig, output_file='viz_genre_comparison.png'):
     """可视化同类应用权限策略差异"""
     genres = [item['genre'] for item in comparison_data]
     common_ratios = [item['common_ratio'] for item in comparison_data]
     
-    plt.figure(figsize=(12, 6))
-    sns.barplot(x=genres, y=common_ratios, palette='magma')
-    plt.title('同类应用权限策略的一致性比例')
-    plt.xlabel('应用类别')
-    plt.ylabel('同类应用共同权限比例 (%)')
-    plt.xticks(rotation=45)
-    plt.axhline(y=50, color='r', linestyle='--', label='50% 参考线')
-    plt.legend()
-    plt.tight_layout()
-    plt.savefig(output_file)
-    plt.close()
+    ax = _prepare_axes(fig)
+    ax.bar(genres, common_ratios, color=_bar_colors('magma', len(genres)), rasterized=True)
+    ax.set_title('同类应用权限策略的一致性比例')
+    ax.set_xlabel('应用类别')
+    ax.set_ylabel('同类应用共同权限比例 (%)')
+    ax.tick_params(axis='x', labelrotation=45)
+    ax.axhline(y=50, color='r', linestyle='--', label='50% 参考线')
+    ax.legend()
+    _fast_savefig(fig, output_file)
     print(f'同类应用权限对比图已保存为 {output_file}')
 
 
+# 绘图进程内复用的画布，首次绘制matplotlib图表时创建
+_process_figure = None
+
+
+def _render_plot(visualize, data, output_file, uses_figure):
+    """在绘图进程中执行一个可视化函数，matplotlib图表复用该进程的画布"""
+    global _process_figure
+    if not uses_figure:
+        visualize(data, output_file)
+        return
+    if _process_figure is None:
+        _process_figure = plt.figure(figsize=(12, 6), dpi=100, constrained_layout=True)
+    visualize(data, _process_figure, output_file)
+
+
 def main():
     # 加载数据
     input_file = 'permission_triples.txt'
     print(f'正在加载数据: {input_file}')
-    apps_data = load_triple_data(input_file)
-    print(f'成功加载 {len(apps_data)} 个应用的数据')
+    triples_df = load_triple_data(input_file)
+    print(f'成功加载 {triples_df["app_idx"].nunique()} 个应用的数据')
+    
+    # 一次性计算各项分析共用的中间结果
+    aggregates = compute_all_aggregates(triples_df)
+    collected = aggregates['collected']
+    permission_counts = aggregates['permission_counts']
+    channel_status = aggregates['channel_status']
+    apps = aggregates['apps']
     
     # 1. 权限使用频率分析
     print('正在进行权限使用频率分析...')
-    freq_result = analyze_permission_frequency(apps_data)
-    visualize_permission_frequency(freq_result['top_permissions'], 'viz_permission_frequency.png')
+    freq_result = analyze_permission_frequency(permission_counts)
     print(f'高频使用权限: {freq_result["top_permissions"]}')
     print(f'高风险权限集群: {freq_result["high_risk_permissions"]}')
     
     # 2. 危险权限分析
     print('正在进行危险权限分析...')
-    dangerous_result = analyze_dangerous_permissions(apps_data)
-    visualize_dangerous_permissions(dangerous_result['dangerous_ratio'], 'viz_dangerous_permissions.png')
+    dangerous_result = analyze_dangerous_permissions(aggregates['dangerous_mask'])
     print(f'危险权限占比: {dangerous_result["dangerous_ratio"]:.2f}%')
     
     # 3. 渠道一致性分析
     print('正在进行渠道一致性分析...')
-    consistency_result = analyze_channel_consistency(apps_data)
-    visualize_channel_consistency(consistency_result, 'viz_channel_consistency.png')
+    consistency_result = analyze_channel_consistency(apps, channel_status)
     print(f'三重渠道一致性比例: {consistency_result["triple_consistency_ratio"]:.2f}%')
     
     # 4. 热力图
     print('正在准备热力图数据...')
-    heatmap_df = prepare_heatmap_data(apps_data)
-    visualize_heatmap(heatmap_df, 'viz_permission_heatmap.png')
+    heatmap_df = prepare_heatmap_data(permission_counts)
     
     # 5. 桑基图
     print('正在准备桑基图数据...')
-    sankey_data = prepare_sankey_data(apps_data)
-    visualize_sankey(sankey_data, 'viz_permission_sankey.html')
+    sankey_data = prepare_sankey_data(channel_status)
     
     # 6. 雷达图
     print('正在准备雷达图数据...')
-    radar_df = prepare_radar_data(apps_data)
-    visualize_radar(radar_df, 'viz_permission_radar.html')
+    radar_df = prepare_radar_data(aggregates['genre_app_counts'], collected)
     
     # 7. 同类应用对比
     print('正在进行同类应用对比分析...')
-    genre_comparison = prepare_genre_comparison_data(apps_data)
-    visualize_genre_comparison(genre_comparison, 'viz_genre_comparison.png')
+    genre_comparison = prepare_genre_comparison_data(apps, collected)
+    
+    # 各图表互不依赖，分发到多个进程并行绘制，每个任务只传递汇总后的数据
+    plots = [
+        (visualize_permission_frequency, freq_result['top_permissions'], 'viz_permission_frequency.png', True),
+        (visualize_dangerous_permissions, dangerous_result['dangerous_ratio'], 'viz_dangerous_permissions.png', True),
+        (visualize_channel_consistency, consistency_result, 'viz_channel_consistency.png', True),
+        (visualize_heatmap, heatmap_df, 'viz_permission_heatmap.png', True),
+        (visualize_sankey, sankey_data, 'viz_permission_sankey.html', False),
+        (visualize_radar, radar_df, 'viz_permission_radar.html', False),
+        (visualize_genre_comparison, genre_comparison, 'viz_genre_comparison.png', True)
+    ]
+    print('正在生成图表...')
+    with ProcessPoolExecutor(max_workers=min(len(plots), os.cpu_count() or 1)) as executor:
+        list(executor.map(_render_plot, *zip(*plots)))
     
     print('所有分析和可视化已完成！')
 